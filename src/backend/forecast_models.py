@@ -1,11 +1,55 @@
-from pmdarima import auto_arima
+from statsforecast.models import AutoARIMA
 import numpy as np
+from numba import njit
+from numpy.lib.stride_tricks import sliding_window_view
 import logging
-from scipy.stats import linregress
+import multiprocessing
+from lightweight_forecast import fit_line
 import warnings
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 logger = logging.getLogger(__name__)
 
+# Heavy ML libraries are imported lazily, at most once per process
+_TORCH = None
+_XGB = None
+_STANDARD_SCALER = None
+
+
+def _torch():
+    """Return the torch module, importing and configuring it on first use."""
+    global _TORCH
+    if _TORCH is None:
+        import torch
+        # Force single-threaded execution for PyTorch in forecasting pool workers.
+        # This is crucial when running multiple LSTM trainings in parallel processes;
+        # the API server process itself (in-process forecasts) keeps its setting.
+        if multiprocessing.parent_process() is not None:
+            try:
+                torch.set_num_threads(1)
+            except Exception:
+                pass
+        _TORCH = torch
+    return _TORCH
+
+
+def _xgb():
+    """Return the xgboost module, importing it on first use."""
+    global _XGB
+    if _XGB is None:
+        import xgboost
+        _XGB = xgboost
+    return _XGB
+
+
+def _standard_scaler():
+    """Return sklearn's StandardScaler class, importing it on first use."""
+    global _STANDARD_SCALER
+    if _STANDARD_SCALER is None:
+        from sklearn.preprocessing import StandardScaler
+        _STANDARD_SCALER = StandardScaler
+    return _STANDARD_SCALER
+
 class ARIMA():
     """ARIMA-based forecasting model for log returns and volatility."""
     
@@ -20,12 +64,14 @@ class ARIMA():
         self.seasonal = seasonal
         self.suppress_warnings = suppress_warnings
     
-    def forecast(self, prices):
+    def forecast(self, prices, log_prices=None, log_returns=None):
         """
         Forecast annual log return and volatility using ARIMA model.
         
         Args:
             prices: Array-like of historical prices
+            log_prices: Optional precomputed np.log(prices)
+            log_returns: Optional precomputed np.diff(log_prices)
             
         Returns:
             tuple: (expected_annual_log_return, annual_volatility)
@@ -37,34 +83,34 @@ class ARIMA():
         try:
             # Convert prices to log returns for model training
             # ln(P_t / P_{t-1}) = ln(P_t) - ln(P_{t-1})
-            log_prices = np.log(prices)
-            log_returns = np.diff(log_prices)
+            if log_prices is None:
+                log_prices = np.log(prices)
+            if log_returns is None:
+                log_returns = np.diff(log_prices)
             
             # Fit ARIMA model
             with warnings.catch_warnings():
                 if self.suppress_warnings:
                     warnings.simplefilter("ignore")
-                model = auto_arima(
-                    log_returns,
+                model = AutoARIMA(
+                    max_p=3, max_q=3, max_d=2,
                     seasonal=self.seasonal,
-                    suppress_warnings=self.suppress_warnings,
-                    error_action='ignore',
-                    max_p=3, max_q=3, max_d=2
+                    season_length=1
                 )
+                model.fit(log_returns)
             
             # Forecast next 252 days (1 year) of log returns
-            forecast_log_returns, _ = model.predict(
-                n_periods=252,
-                return_conf_int=True
-            )
+            forecast = model.predict(h=252)
+            forecast_log_returns = forecast['mean']
             
             # Calculate cumulative expected log return (sum of daily log returns)
             # Sum of log returns = ln(P_T / P_0)
             cumulative_log_return = np.sum(forecast_log_returns)
             
-            # Calculate annual volatility from daily log returns std dev
-            forecast_std = np.std(forecast_log_returns)
-            annual_volatility = forecast_std * np.sqrt(252)
+            # Annual volatility from the fitted innovation variance; the spread
+            # of point forecasts only measures mean reversion, not daily risk
+            sigma_daily = float(np.sqrt(model.model_['sigma2']))
+            annual_volatility = sigma_daily * np.sqrt(252)
             
             # Ensure minimum volatility
             annual_volatility = max(annual_volatility, 0.01)
@@ -76,9 +122,9 @@ class ARIMA():
             # Fallback to simple linear trend if ARIMA fails
             try:
                 # Use log prices for linear trend
-                log_prices = np.log(prices)
-                x = np.arange(len(log_prices)).reshape(-1, 1)
-                slope, intercept, _, _, _ = linregress(x.flatten(), log_prices)
+                if log_prices is None:
+                    log_prices = np.log(prices)
+                slope, intercept = fit_line(log_prices)
                 
                 # Predict future log price (252 days out)
                 current_log_price = log_prices[-1]
@@ -88,7 +134,8 @@ class ARIMA():
                 expected_log_return = future_log_price - current_log_price
                 
                 # Estimate volatility from historical log returns
-                log_returns = np.diff(log_prices)
+                if log_returns is None:
+                    log_returns = np.diff(log_prices)
                 volatility = np.std(log_returns) * np.sqrt(252)
                 
                 return (expected_log_return, volatility)
@@ -97,9 +144,9 @@ class ARIMA():
 
 
 class LSTMModel():
-    """LSTM neural network for time series forecasting.
+    """LSTM neural network for time series forecasting (PyTorch).
     
-    WARNING: LSTM/TensorFlow는 많은 메모리를 사용합니다.
+    WARNING: LSTM 모델은 많은 메모리를 사용합니다.
     사용 후 반드시 cleanup() 메서드를 호출하거나 del로 삭제하세요.
     """
     
@@ -123,10 +170,11 @@ class LSTMModel():
         """명시적 메모리 해제 - 사용 후 반드시 호출하세요."""
         if self.model is not None:
             try:
-                import tensorflow as tf
+                torch = _torch()
                 del self.model
                 self.model = None
-                tf.keras.backend.clear_session()
+                if torch.cuda.is_available():
+                    torch.cuda.empty_cache()
             except Exception:
                 pass
         self.scaler_X = None
@@ -137,51 +185,39 @@ class LSTMModel():
         self.cleanup()
         
     def _create_sequences(self, data, lookback=60):
-        """Create sequences for LSTM training."""
-        X, y = [], []
-        for i in range(lookback, len(data)):
-            X.append(data[i-lookback:i])
-            y.append(data[i])
-        return np.array(X), np.array(y)
+        """Create sequences for LSTM training (zero-copy strided windows)."""
+        series = data[:, 0]
+        X = sliding_window_view(series, lookback)[:-1]
+        y = series[lookback:]
+        return X, y
     
-    def train(self, prices):
+    def train(self, prices, log_returns=None):
         """
         Train LSTM model on price data using log returns.
         
         Args:
             prices: Array-like of historical prices
+            log_returns: Optional precomputed log returns of prices
         """
         try:
-            import tensorflow as tf
-            # Force single-threaded execution for TensorFlow in this process
-            # This is crucial when running multiple LSTM trainings in parallel processes
-            try:
-                tf.config.threading.set_intra_op_parallelism_threads(1)
-                tf.config.threading.set_inter_op_parallelism_threads(1)
-            except Exception:
-                # Configuration might fail if TF is already initialized, which is expected/okay
-                pass
-
-            from tensorflow import keras
-            from sklearn.preprocessing import StandardScaler
-            
-            # Suppress TensorFlow warnings
-            tf.get_logger().setLevel('ERROR')
+            torch = _torch()
+            nn = torch.nn
+            StandardScaler = _standard_scaler()
             
             if len(prices) < 100:
                 logger.warning("Insufficient data for LSTM training, using simplified model")
                 self.model = None
                 return
             
-            # Prepare data: Log Returns
-            log_prices = np.log(prices)
-            log_returns = np.diff(log_prices)
-            log_returns = log_returns.reshape(-1, 1)
+            # Prepare data: Log Returns (float32 end-to-end, as the network consumes it)
+            if log_returns is None:
+                log_returns = np.diff(np.log(prices))
+            log_returns = log_returns.astype(np.float32, copy=False).reshape(-1, 1)
             
-            # Scale data
+            # Scale data (StandardScaler preserves float32)
             self.scaler_X = StandardScaler()
             self.scaler_X = StandardScaler()
-            scaled_returns = self.scaler_X.fit_transform(log_returns)
+            scaled_returns = self.scaler_X.fit_transform(log_returns).astype(np.float32, copy=False)
             
             # Create sequences
             lookback = min(60, len(scaled_returns) // 3)
@@ -192,25 +228,42 @@ class LSTMModel():
                 self.model = None
                 return
             
-            # Reshape for LSTM
-            X = X.reshape(X.shape[0], X.shape[1], 1)
-            
-            # Build model
-            model = keras.Sequential()
-            model.add(keras.layers.LSTM(self.units, return_sequences=(self.layers > 1), 
-                                       input_shape=(X.shape[1], 1)))
-            model.add(keras.layers.Dropout(self.dropout))
-            
-            for i in range(1, self.layers):
-                return_seq = i < self.layers - 1
-                model.add(keras.layers.LSTM(self.units, return_sequences=return_seq))
-                model.add(keras.layers.Dropout(self.dropout))
-            
-            model.add(keras.layers.Dense(1))
-            
-            # Compile and train
-            model.compile(optimizer='adam', loss='mse')
-            model.fit(X, y, epochs=20, batch_size=32, verbose=0, validation_split=0.1)
+            # nn.LSTM binds to cuDNN directly when a GPU is present
+            device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+            # X is a read-only strided view: materialize it once; y is already contiguous
+            X_t = torch.from_numpy(np.ascontiguousarray(X[..., None])).to(device)
+            y_t = torch.from_numpy(y).reshape(-1, 1).to(device)
+            
+            # Build model: stacked LSTM -> Dropout -> Linear head
+            model = nn.ModuleDict({
+                'lstm': nn.LSTM(
+                    input_size=1,
+                    hidden_size=self.units,
+                    num_layers=self.layers,
+                    dropout=self.dropout if self.layers > 1 else 0.0,
+                    batch_first=True
+                ),
+                'dropout': nn.Dropout(self.dropout),
+                'head': nn.Linear(self.units, 1)
+            }).to(device)
+            
+            optimizer = torch.optim.Adam(model.parameters())
+            loss_fn = nn.MSELoss()
+            
+            # Train: 20 epochs of shuffled mini-batches of 32
+            model.train()
+            n_samples = X_t.shape[0]
+            for _ in range(20):
+                permutation = torch.randperm(n_samples, device=device)
+                for start in range(0, n_samples, 32):
+                    batch_idx = permutation[start:start + 32]
+                    output, _ = model['lstm'](X_t[batch_idx])
+                    pred = model['head'](model['dropout'](output[:, -1, :]))
+                    loss = loss_fn(pred, y_t[batch_idx])
+                    optimizer.zero_grad()
+                    loss.backward()
+                    optimizer.step()
+            model.eval()
             
             self.model = model
             self.lookback = lookback
@@ -255,6 +308,116 @@ class LSTMModel():
             logger.error(f"LSTM forecast failed: {e}")
             return 0.08
 
+@njit(cache=True)
+def _rsi(prices, period=14):
+    """
+    Wilder-smoothed RSI in a single O(N) pass.
+    
+    Averages are seeded with the mean gain/loss of the first `period` price
+    changes, then updated recursively. Entries before `period` are NaN.
+    """
+    n = prices.shape[0]
+    out = np.full(n, np.nan)
+    if n <= period:
+        return out
+    
+    gain_avg = 0.0
+    loss_avg = 0.0
+    for i in range(1, period + 1):
+        delta = prices[i] - prices[i - 1]
+        if delta > 0:
+            gain_avg += delta
+        else:
+            loss_avg -= delta
+    gain_avg /= period
+    loss_avg /= period
+    out[period] = 100.0 - 100.0 / (1.0 + gain_avg / (loss_avg + 1e-10))
+    
+    for i in range(period + 1, n):
+        delta = prices[i] - prices[i - 1]
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        gain_avg = (gain_avg * (period - 1) + gain) / period
+        loss_avg = (loss_avg * (period - 1) + loss) / period
+        out[i] = 100.0 - 100.0 / (1.0 + gain_avg / (loss_avg + 1e-10))
+    
+    return out
+
+
+@njit(cache=True)
+def _engineer_features_kernel(prices):
+    """
+    Single-pass XGBoost feature kernel.
+    
+    Keeps running sums for every rolling window so each price is read once,
+    matching the pandas rolling(...).sum/mean/std(ddof=1) semantics.
+    The RSI column uses Wilder smoothing (see _rsi).
+    """
+    n = prices.shape[0]
+    out = np.full((n, 9), np.nan)
+    
+    p_sum5 = 0.0
+    p_sum20 = 0.0
+    p_sum50 = 0.0
+    r_sum5 = 0.0
+    r_sum10 = 0.0
+    r_sum20 = 0.0
+    r_sq10 = 0.0
+    r_sq20 = 0.0
+    
+    for i in range(n):
+        p = prices[i]
+        
+        # Moving averages of price (ratio to current price)
+        p_sum5 += p
+        p_sum20 += p
+        p_sum50 += p
+        if i >= 5:
+            p_sum5 -= prices[i - 5]
+        if i >= 20:
+            p_sum20 -= prices[i - 20]
+        if i >= 50:
+            p_sum50 -= prices[i - 50]
+        if i >= 4:
+            out[i, 3] = p_sum5 / 5.0 / p
+        if i >= 19:
+            out[i, 4] = p_sum20 / 20.0 / p
+        if i >= 49:
+            out[i, 5] = p_sum50 / 50.0 / p
+        
+        if i == 0:
+            continue
+        
+        # Log returns: ln(P_t / P_{t-1})
+        r = np.log(p / prices[i - 1])
+        out[i, 0] = r
+        r_sum5 += r
+        r_sum10 += r
+        r_sum20 += r
+        r_sq10 += r * r
+        r_sq20 += r * r
+        if i > 5:
+            r_sum5 -= out[i - 5, 0]
+        if i > 10:
+            old = out[i - 10, 0]
+            r_sum10 -= old
+            r_sq10 -= old * old
+        if i > 20:
+            old = out[i - 20, 0]
+            r_sum20 -= old
+            r_sq20 -= old * old
+        if i >= 5:
+            out[i, 1] = r_sum5
+        if i >= 20:
+            out[i, 2] = r_sum20
+            out[i, 7] = np.sqrt(max((r_sq20 - r_sum20 * r_sum20 / 20.0) / 19.0, 0.0))
+        if i >= 10:
+            out[i, 6] = np.sqrt(max((r_sq10 - r_sum10 * r_sum10 / 10.0) / 9.0, 0.0))
+    
+    out[:, 8] = _rsi(prices, 14)
+    return out
+
+
 class XGBoostModel:
     """XGBoost forecasting model."""
     
@@ -266,43 +429,16 @@ class XGBoostModel:
         """
         Create features from price data using log returns.
         
+        Columns: log_ret_1d, log_ret_5d, log_ret_20d, ma_5, ma_20, ma_50,
+        volatility_10d, volatility_20d, rsi. Warm-up rows are NaN.
+        
         Args:
             prices: Array-like of historical prices
             
         Returns:
-            DataFrame: Engineered features
+            ndarray: Engineered features, shape (N, 9)
         """
-        import pandas as pd
-        
-        df = pd.DataFrame({'price': prices})
-        
-        # Log Returns: ln(P_t / P_{t-1})
-        df['log_ret_1d'] = np.log(df['price'] / df['price'].shift(1))
-        
-        # Others can be based on log returns for consistency
-        df['log_ret_5d'] = df['log_ret_1d'].rolling(5).sum()
-        df['log_ret_20d'] = df['log_ret_1d'].rolling(20).sum()
-        
-        # Moving averages (Ratio of price to MA fits well with log world too, but keeping as ratio is fine)
-        df['ma_5'] = df['price'].rolling(5).mean() / df['price']
-        df['ma_20'] = df['price'].rolling(20).mean() / df['price']
-        df['ma_50'] = df['price'].rolling(50).mean() / df['price']
-        
-        # Volatility of log returns
-        df['volatility_10d'] = df['log_ret_1d'].rolling(10).std()
-        df['volatility_20d'] = df['log_ret_1d'].rolling(20).std()
-        
-        # Momentum (Difference in prices) - less robust, maybe replace with log price diff (which is return)
-        # Keeping similar to before but scaled or just use log returns
-        
-        # RSI-like feature (Log RSI? Standard RSI on prices is standard)
-        delta = df['price'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-        rs = gain / (loss + 1e-10)
-        df['rsi'] = 100 - (100 / (1 + rs))
-        
-        return df.iloc[:, 1:]  # Exclude price column
+        return _engineer_features_kernel(np.ascontiguousarray(prices, dtype=np.float64))
     
     def train(self, prices):
         """
@@ -312,7 +448,7 @@ class XGBoostModel:
             prices: Array-like of historical prices
         """
         try:
-            import xgboost as xgb
+            xgb = _xgb()
             
             if len(prices) < 100:
                 logger.warning("Insufficient data for XGBoost training")
@@ -320,15 +456,17 @@ class XGBoostModel:
                 return
             
             # Engineer features
-            features_df = self._engineer_features(prices)
+            features = self._engineer_features(prices)
             
             # Create target (next day log return)
-            target = features_df['log_ret_1d'].shift(-1)
+            target = np.empty(len(features))
+            target[:-1] = features[1:, 0]
+            target[-1] = np.nan
             
             # Drop NaN rows
-            valid_idx = ~(features_df.isna().any(axis=1) | target.isna())
-            X = features_df[valid_idx].values
-            y = target[valid_idx].values
+            valid_idx = ~(np.isnan(features).any(axis=1) | np.isnan(target))
+            X = features[valid_idx]
+            y = target[valid_idx]
             
             if len(X) < 50:
                 logger.warning("Insufficient valid samples for XGBoost")
@@ -339,10 +477,13 @@ class XGBoostModel:
             self.feature_means = np.mean(X, axis=0)
             
             # Train model
+            # Histogram split finding; n_jobs stays 1 because tickers are
+            # already fanned out across single-threaded worker processes.
             self.model = xgb.XGBRegressor(
                 n_estimators=100,
                 max_depth=5,
                 learning_rate=0.1,
+                tree_method='hist',
                 random_state=42,
                 verbosity=0,
                 n_jobs=1
@@ -387,35 +528,75 @@ class EnsemblePredictor:
     """
     Ensemble model that combines predictions from ARIMA, LSTM, and XGBoost.
     Uses soft voting (averaging) for the final prediction and standard deviation for uncertainty.
+    
+    LSTM only joins the ensemble when the history is long enough to justify its
+    training cost (see LSTM_MIN_POINTS).
     """
     
+    LSTM_MIN_POINTS = 500
+    
     def __init__(self):
         self.models = {
             'ARIMA': ARIMA(seasonal=False, suppress_warnings=True),
-            'LSTM': LSTMModel(layers=2, units=32, dropout=0.2),
             'XGBoost': XGBoostModel()
         }
         self.history = None
+        self.log_prices = None
+        self.log_returns = None
 
     def train_all(self, prices):
         """
         Train all ensemble models on the provided price data.
         
+        The prices are normalized once to a contiguous float64 1D array; every
+        component's train/forecast receives that array (and the derived log
+        series) rather than the caller's original array-like.
+        
         Args:
             prices: Array-like of historical prices
         """
-        self.history = prices
+        self.history = np.ascontiguousarray(prices, dtype=np.float64)
+        prices = self.history
+        # Shared by every component instead of each re-deriving them
+        self.log_prices = np.log(prices)
+        self.log_returns = np.diff(self.log_prices)
         
-        for name, model in self.models.items():
-            try:
-                # logger.info(f"Training {name} model...")
-                if isinstance(model, ARIMA):
-                    # ARIMA logic executed at forecast time
-                    pass 
+        # Short histories skip the LSTM entirely
+        if len(prices) >= self.LSTM_MIN_POINTS:
+            self.models['LSTM'] = LSTMModel(layers=2, units=32, dropout=0.2)
+        else:
+            self.models.pop('LSTM', None)
+        
+        # ARIMA logic executed at forecast time; the rest train concurrently
+        # (their fitting loops run in native code and release the GIL)
+        trainable = {name: model for name, model in self.models.items()
+                     if not isinstance(model, ARIMA)}
+        
+        with ThreadPoolExecutor(max_workers=max(1, len(trainable))) as executor:
+            future_to_name = {}
+            for name, model in trainable.items():
+                if isinstance(model, LSTMModel):
+                    future = executor.submit(model.train, prices, log_returns=self.log_returns)
                 else:
-                    model.train(prices)
-            except Exception as e:
-                logger.error(f"Failed to train {name}: {e}")
+                    future = executor.submit(model.train, prices)
+                future_to_name[future] = name
+            for future in as_completed(future_to_name):
+                name = future_to_name[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.error(f"Failed to train {name}: {e}")
+    
+    def _predict_component(self, model):
+        """Run a single component model's forecast."""
+        if isinstance(model, ARIMA):
+            if self.history is None or len(self.history) == 0:
+                return None
+            # ARIMA returns (return, volatility)
+            pred_ret, _ = model.forecast(self.history, self.log_prices, self.log_returns)
+            return pred_ret
+        # Others return float
+        return model.forecast()
 
     def predict(self):
         """
@@ -431,19 +612,19 @@ class EnsemblePredictor:
         predictions = []
         component_results = {}
         
-        for name, model in self.models.items():
+        with ThreadPoolExecutor(max_workers=len(self.models)) as executor:
+            futures = {name: executor.submit(self._predict_component, model)
+                       for name, model in self.models.items()}
+        
+        # Collect in model order so the ensemble output is deterministic
+        for name, future in futures.items():
             try:
-                if isinstance(model, ARIMA):
-                    if self.history is None or len(self.history) == 0:
-                        continue
-                    # ARIMA returns (return, volatility)
-                    pred_ret, _ = model.forecast(self.history)
-                else:
-                    # Others return float
-                    pred_ret = model.forecast()
+                pred_ret = future.result()
+                if pred_ret is None:
+                    continue
                 
                 # Check for nan/inf
-                if np.isnan(pred_ret) or np.isinf(pred_ret):
+                if not np.isfinite(pred_ret):
                     logger.warning(f"{name} returned invalid prediction: {pred_ret}")
                     continue
                     
@@ -462,11 +643,12 @@ class EnsemblePredictor:
                 'components': {}
             }
             
-        mean_prediction = np.mean(predictions)
-        std_prediction = np.std(predictions) if len(predictions) > 1 else 0.05
+        arr = np.asarray(predictions, dtype=np.float64)
+        mean_prediction = float(arr.mean())
+        std_prediction = float(arr.std()) if arr.size > 1 else 0.05
         
         return {
-            'expected_return': float(mean_prediction),
-            'uncertainty': float(std_prediction),
+            'expected_return': mean_prediction,
+            'uncertainty': std_prediction,
             'components': component_results
         }
@@ -5,12 +5,51 @@ These methods don't require extensive historical data and provide fast predictio
 
 import numpy as np
 import logging
-from scipy.stats import linregress
-from sklearn.linear_model import LinearRegression
+from functools import lru_cache
+from numba import njit
 
 logger = logging.getLogger(__name__)
 
 
+@njit(cache=True, fastmath=True)
+def _ewma_columns(prices, starts, alpha):
+    """Column-wise exponential smoothing of a (T, N) block.
+    
+    Each column is smoothed from its own first valid row ``starts[j]``;
+    rows before that are left as NaN.
+    """
+    n_rows, n_cols = prices.shape
+    out = np.empty_like(prices)
+    for i in range(n_rows):
+        for j in range(n_cols):
+            if i < starts[j]:
+                out[i, j] = np.nan
+            elif i == starts[j]:
+                out[i, j] = prices[i, j]
+            else:
+                out[i, j] = alpha * prices[i, j] + (1 - alpha) * out[i - 1, j]
+    return out
+
+
+def fit_line(y):
+    """Closed-form OLS fit of y against 0..n-1.
+    
+    Returns:
+        tuple: (slope, intercept)
+    """
+    y = np.asarray(y, dtype=np.float64)
+    x = np.arange(y.size)
+    x_dev = x - x.mean()
+    y_mean = y.mean()
+    slope = np.dot(x_dev, y - y_mean) / np.dot(x_dev, x_dev)
+    return slope, y_mean - slope * x.mean()
+
+
+def _single_column(prices):
+    """Right-aligned (T, 1) block and valid count for one price series."""
+    return right_align(np.asarray(prices, dtype=np.float64).reshape(-1, 1))
+
+
 def exponential_smoothing_forecast(prices, alpha=0.3):
     """Fast exponential smoothing forecast.
     
@@ -21,31 +60,7 @@ def exponential_smoothing_forecast(prices, alpha=0.3):
     Returns:
         Expected annual return (float)
     """
-    if len(prices) < 2:
-        return 0.05
-    
-    # Simple exponential smoothing
-    smoothed = [prices[0]]
-    for i in range(1, len(prices)):
-        smoothed.append(alpha * prices[i] + (1 - alpha) * smoothed[i-1])
-    
-    # Calculate trend from last 30 days
-    recent_data = smoothed[-30:] if len(smoothed) >= 30 else smoothed
-    if len(recent_data) < 2:
-        return 0.05
-    
-    # Linear trend extrapolation
-    x = np.arange(len(recent_data))
-    slope, intercept, _, _, _ = linregress(x, recent_data)
-    
-    # Project 252 days ahead (1 year)
-    future_price = slope * (len(recent_data) + 252) + intercept
-    current_price = recent_data[-1]
-    
-    if current_price <= 0:
-        return 0.05
-    
-    return (future_price / current_price) - 1
+    return float(_exp_smoothing_batch(*_single_column(prices), alpha)[0])
 
 
 def linear_trend_forecast(prices):
@@ -57,29 +72,7 @@ def linear_trend_forecast(prices):
     Returns:
         Expected annual return (float)
     """
-    if len(prices) < 10:
-        return 0.05
-    
-    # Use last 90 days for trend analysis
-    recent_prices = prices[-90:] if len(prices) >= 90 else prices
-    x = np.arange(len(recent_prices)).reshape(-1, 1)
-    y = recent_prices
-    
-    try:
-        model = LinearRegression()
-        model.fit(x, y)
-        
-        # Predict 252 days ahead
-        future_x = np.array([[len(recent_prices) + 252]])
-        future_price = model.predict(future_x)[0]
-        current_price = recent_prices[-1]
-        
-        if current_price <= 0:
-            return 0.05
-        
-        return (future_price / current_price) - 1
-    except:
-        return 0.05
+    return float(_linear_trend_batch(*_single_column(prices))[0])
 
 
 def historical_volatility_adjusted_forecast(prices):
@@ -91,26 +84,7 @@ def historical_volatility_adjusted_forecast(prices):
     Returns:
         Expected annual return (float)
     """
-    if len(prices) < 30:
-        return 0.05
-    
-    returns = np.diff(prices) / prices[:-1]
-    returns = returns[~np.isnan(returns)]  # Remove NaN values
-    
-    if len(returns) < 10:
-        return 0.05
-    
-    mean_return = np.mean(returns)
-    volatility = np.std(returns)
-    
-    # Annualized return with volatility adjustment
-    annual_return = mean_return * 252
-    
-    # Apply volatility penalty for very volatile stocks
-    if volatility > 0.05:  # 5% daily volatility threshold
-        annual_return *= 0.8  # Reduce expected return for high volatility
-    
-    return annual_return
+    return float(_vol_adjusted_batch(*_single_column(prices))[0])
 
 
 def lightweight_ensemble_forecast(prices):
@@ -129,15 +103,105 @@ def lightweight_ensemble_forecast(prices):
         logger.warning(f"Insufficient data for lightweight forecast: {len(prices)} points")
         return 0.05
     
-    # Use ensemble of lightweight methods
-    exp_forecast = exponential_smoothing_forecast(prices)
-    trend_forecast = linear_trend_forecast(prices)
-    vol_forecast = historical_volatility_adjusted_forecast(prices)
+    # The forecast is a pure function of the price history: memoize on its bytes
+    prices = np.ascontiguousarray(prices, dtype=np.float64)
+    return _cached_ensemble_forecast(prices.tobytes(), prices.size)
+
+
+@lru_cache(maxsize=256)
+def _cached_ensemble_forecast(prices_bytes, n):
+    """Memoized body of lightweight_ensemble_forecast keyed on the raw price buffer."""
+    prices = np.frombuffer(prices_bytes, dtype=np.float64, count=n)
+    return lightweight_ensemble_forecast_batch(prices[:, None])[0]
+
+
+def right_align(prices_2d):
+    """Move each column's valid prices to the bottom of the block, in order.
+    
+    Returns:
+        tuple: (aligned block with leading NaNs, valid-point count per column)
+    """
+    mask = ~np.isnan(prices_2d)
+    order = np.argsort(mask, axis=0, kind='stable')
+    return np.take_along_axis(prices_2d, order, axis=0), mask.sum(axis=0)
+
+
+def _trend_forecast_batch(aligned, counts, window):
+    """Per-column OLS trend over the last min(window, count) points, projected 252 days ahead."""
+    block = aligned[-window:]
+    n_rows = block.shape[0]
+    w = np.minimum(window, counts)
+    x = np.arange(n_rows)[:, None] - (n_rows - w)[None, :]
+    in_window = x >= 0
+    w_safe = np.maximum(w, 1)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_mean = np.where(in_window, x, 0).sum(axis=0) / w_safe
+        y_mean = np.where(in_window, block, 0.0).sum(axis=0) / w_safe
+        x_dev = np.where(in_window, x - x_mean, 0.0)
+        y_dev = np.where(in_window, block - y_mean, 0.0)
+        slope = (x_dev * y_dev).sum(axis=0) / (x_dev * x_dev).sum(axis=0)
+        intercept = y_mean - slope * x_mean
+        
+        future_price = slope * (w + 252) + intercept
+        current_price = block[-1]
+        forecast = np.where(current_price > 0, future_price / current_price - 1, 0.05)
+    return np.where(w >= 2, forecast, 0.05)
+
+
+def _exp_smoothing_batch(aligned, counts, alpha):
+    """Exponential smoothing per column, then the trend of its last 30 points."""
+    n_rows = aligned.shape[0]
+    smoothed = _ewma_columns(aligned, (n_rows - counts).astype(np.int64), alpha)
+    return _trend_forecast_batch(smoothed, counts, 30)
+
+
+def _linear_trend_batch(aligned, counts):
+    """Linear trend over the last 90 raw prices; 0.05 below 10 points."""
+    return np.where(counts >= 10, _trend_forecast_batch(aligned, counts, 90), 0.05)
+
+
+def _vol_adjusted_batch(aligned, counts):
+    """Volatility-adjusted historical mean of log returns; 0.05 below 30 points."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.diff(np.log(aligned), axis=0)
+        finite = np.isfinite(returns)
+        n_returns = finite.sum(axis=0)
+        n_safe = np.maximum(n_returns, 1)
+        mean_return = np.where(finite, returns, 0.0).sum(axis=0) / n_safe
+        volatility = np.sqrt(np.where(finite, (returns - mean_return) ** 2, 0.0).sum(axis=0) / n_safe)
+    # Reduce expected return for very volatile stocks (5% daily volatility threshold)
+    vol_forecast = mean_return * 252 * np.where(volatility > 0.05, 0.8, 1.0)
+    return np.where((counts >= 30) & (n_returns >= 10), vol_forecast, 0.05)
+
+
+def lightweight_ensemble_forecast_batch(prices_2d):
+    """Vectorized lightweight_ensemble_forecast over a (T, N) price block.
+    
+    Columns may contain NaNs anywhere; each column is forecast from its own
+    valid prices, exactly as the per-series methods would.
+    
+    Args:
+        prices_2d: Array of historical prices, dates as rows and tickers as columns
+    
+    Returns:
+        np.ndarray: Expected annual return per column, shape (N,)
+    """
+    prices_2d = np.asarray(prices_2d, dtype=np.float64)
+    if prices_2d.ndim == 1:
+        prices_2d = prices_2d[:, None]
+    aligned, counts = right_align(prices_2d)
+    exp_forecast = _exp_smoothing_batch(aligned, counts, 0.3)
+    trend_forecast = _linear_trend_batch(aligned, counts)
+    vol_forecast = _vol_adjusted_batch(aligned, counts)
     
     # Weighted average with more weight on exponential smoothing
-    forecast_value = (0.4 * exp_forecast + 0.3 * trend_forecast + 0.3 * vol_forecast)
+    forecast_value = 0.4 * exp_forecast + 0.3 * trend_forecast + 0.3 * vol_forecast
     
     # Clip to reasonable bounds
     forecast_value = np.clip(forecast_value, -0.5, 1.0)
     
-    return forecast_value
+    insufficient = counts < 10
+    if insufficient.any():
+        logger.warning(f"Insufficient data for lightweight forecast in {int(insufficient.sum())} series")
+    return np.where(insufficient, 0.05, forecast_value)
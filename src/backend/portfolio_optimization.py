@@ -1,28 +1,43 @@
 import json
 import logging
+import sys
+from functools import lru_cache, singledispatch
 import hashlib
+import itertools
 import re
 import warnings
 from pathlib import Path
 import time
-from datetime import datetime, timedelta
+import threading
+import atexit
 
-# Silence Protobuf warnings from TensorFlow/Google libraries
+# Silence Protobuf warnings from Google libraries
 warnings.filterwarnings("ignore", message=".*Protobuf gencode version.*")
 
 import yfinance as yf
 import pandas as pd
 import numpy as np
-from pypfopt import EfficientFrontier, risk_models, objective_functions, BlackLittermanModel, black_litterman
+import cvxpy as cp
+from scipy.linalg import cho_factor, cho_solve
+from numba import njit
+from pypfopt import black_litterman
 from pypfopt.exceptions import OptimizationError
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, TimeoutError as FuturesTimeoutError
+from multiprocessing import shared_memory
 import gc
+import psutil
+# orjson (C-accelerated, numpy-aware) is optional; stdlib json is the fallback
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 from cache_manager import (
     get_cache, cached
 )
 from ticker_lists import get_ticker_group
 from forecast_models import EnsemblePredictor
-from lightweight_forecast import lightweight_ensemble_forecast
+from lightweight_forecast import lightweight_ensemble_forecast, lightweight_ensemble_forecast_batch, right_align
 
 # Configure logging for this module
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -30,6 +45,20 @@ logger = logging.getLogger(__name__)
 
 RESULTS_DIR = Path("logs/portfolio_results")
 
+# Allowed ticker characters: alphanumeric, dots, dashes, carets
+_TICKER_RE = re.compile(r'^[A-Z0-9\.\-\^]+$', re.IGNORECASE)
+
+# Cache stats are logged for one in every CACHE_STATS_EVERY optimize_portfolio calls
+CACHE_STATS_EVERY = 100
+_optimize_calls = itertools.count()
+
+# Result files are written off the request path; pending writes are tracked per
+# portfolio_id so loads and listings still see them. Flushed on interpreter exit.
+_persist_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="persist")
+atexit.register(_persist_pool.shutdown, wait=True)
+_pending_saves = {}
+_pending_saves_lock = threading.Lock()
+
 
 def worker_initializer():
     """Initialize worker process environment to restrict threading."""
@@ -39,10 +68,11 @@ def worker_initializer():
     os.environ['OMP_NUM_THREADS'] = '1'
     os.environ['MKL_NUM_THREADS'] = '1'
     os.environ['OPENBLAS_NUM_THREADS'] = '1'
-    os.environ['TF_NUM_INTRAOP_THREADS'] = '1'
-    os.environ['TF_NUM_INTEROP_THREADS'] = '1'
     # Also for numexpr if used by pandas/numpy
     os.environ['NUMEXPR_NUM_THREADS'] = '1'
+    # Move the already-imported module state into the permanent generation
+    # so the cyclic collector in this worker never rescans it.
+    gc.freeze()
 
 
 def _ensure_results_dir():
@@ -50,19 +80,33 @@ def _ensure_results_dir():
     RESULTS_DIR.mkdir(parents=True, exist_ok=True)
 
 
+@singledispatch
 def _to_serializable(value):
-    """Convert numpy/pandas objects to JSON-serializable primitives."""
-    if isinstance(value, (np.generic, np.float32, np.float64)):
-        return float(value)
-    if isinstance(value, (np.integer, np.int32, np.int64)):
-        return int(value)
-    if isinstance(value, (pd.Series, pd.Index)):
-        return [_to_serializable(v) for v in value.tolist()]
-    if isinstance(value, dict):
-        return {k: _to_serializable(v) for k, v in value.items()}
-    if isinstance(value, (list, tuple, set)):
-        return [_to_serializable(v) for v in value]
-    return value
+    """json.dump `default` hook: convert numpy/pandas objects to JSON primitives.
+    
+    Only invoked for objects the encoder cannot handle natively, so payloads made
+    of plain Python types are written without any extra traversal. Conversions are
+    registered per type so each call is a single dispatch-table lookup.
+    """
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+@_to_serializable.register(np.generic)
+def _(value):
+    return value.item()
+
+
+@_to_serializable.register(np.ndarray)
+@_to_serializable.register(pd.Series)
+@_to_serializable.register(pd.Index)
+def _(value):
+    return value.tolist()
+
+
+@_to_serializable.register(set)
+@_to_serializable.register(frozenset)
+def _(value):
+    return list(value)
 
 
 def save_portfolio_result(portfolio_id, result, metadata=None):
@@ -74,30 +118,78 @@ def save_portfolio_result(portfolio_id, result, metadata=None):
 
     payload = {
         "portfolio_id": portfolio_id,
-        "result": _to_serializable(result),
-        "metadata": _to_serializable(metadata or {}),
+        "result": result,
+        "metadata": metadata or {},
         "saved_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
     }
 
+    if ORJSON_AVAILABLE:
+        # numpy scalars/arrays are encoded natively; the hook only sees pandas/sets
+        options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        raw = orjson.dumps(payload, default=_to_serializable, option=options)
+    else:
+        raw = json.dumps(payload, default=_to_serializable, separators=(",", ":")).encode("utf-8")
+
+    # Write to a temp file and rename over the target, so a crashed or
+    # concurrent write never leaves a truncated result behind
     _ensure_results_dir()
     output_path = RESULTS_DIR / f"{portfolio_id}.json"
-    with open(output_path, "w", encoding="utf-8") as file:
-        json.dump(payload, file, indent=2)
+    tmp_path = output_path.with_name(f".{portfolio_id}.{threading.get_ident()}.tmp")
+    tmp_path.write_bytes(raw)
+    tmp_path.replace(output_path)
     logger.info(f"Saved portfolio result to {output_path}")
 
 
+def save_portfolio_result_async(portfolio_id, result, metadata=None):
+    """Queue save_portfolio_result on the background persistence pool.
+    
+    The caller must not mutate result or metadata afterwards.
+    
+    Returns:
+        concurrent.futures.Future: completes when the file is written
+    """
+    future = _persist_pool.submit(save_portfolio_result, portfolio_id, result, metadata)
+    with _pending_saves_lock:
+        _pending_saves[portfolio_id] = future
+    future.add_done_callback(lambda f: _finish_pending_save(portfolio_id, f))
+    return future
+
+
+def _finish_pending_save(portfolio_id, future):
+    """Drop a completed save from the pending table and log its failure, if any."""
+    with _pending_saves_lock:
+        if _pending_saves.get(portfolio_id) is future:
+            del _pending_saves[portfolio_id]
+    if future.exception() is not None:
+        logger.error(f"Saving portfolio result {portfolio_id} failed: {future.exception()}")
+
+
+def _wait_for_pending_saves(portfolio_id=None):
+    """Block until queued saves (of one portfolio_id, or all) have been written."""
+    with _pending_saves_lock:
+        if portfolio_id is None:
+            futures = list(_pending_saves.values())
+        else:
+            futures = [f for f in (_pending_saves.get(portfolio_id),) if f is not None]
+    if futures:
+        wait(futures)
+
+
 def load_portfolio_result(portfolio_id):
     """Load a previously saved portfolio optimization result."""
     if not portfolio_id:
         raise ValueError("portfolio_id is required to load results")
 
+    _wait_for_pending_saves(portfolio_id)
     output_path = RESULTS_DIR / f"{portfolio_id}.json"
-    if not output_path.exists():
+    try:
+        with open(output_path, "rb") as file:
+            raw = file.read()
+    except FileNotFoundError:
         logger.info(f"No saved portfolio result found for {portfolio_id}")
         return None
-
-    with open(output_path, "r", encoding="utf-8") as file:
-        payload = json.load(file)
+    # Parsed fresh on every load: orjson parsing is cheaper than copying a memoized payload
+    payload = orjson.loads(raw) if ORJSON_AVAILABLE else json.loads(raw)
 
     result = payload.get("result", {})
     result["metadata"] = payload.get("metadata", {})
@@ -109,6 +201,7 @@ def load_portfolio_result(portfolio_id):
 
 def list_saved_portfolios():
     """Return available saved portfolio identifiers."""
+    _wait_for_pending_saves()
     if not RESULTS_DIR.exists():
         return []
     return sorted(p.stem for p in RESULTS_DIR.glob("*.json"))
@@ -128,6 +221,28 @@ def get_stock_data(tickers, start_date, end_date, progress_callback=None):
         for i in range(0, len(iterable), size):
             yield iterable[i:i + size]
 
+    def _fetch_single_safe(ticker):
+        try:
+            # Ticker.history keeps its state on the Ticker object, unlike yf.download's
+            # module-level result buffers, so it can overlap with the batch downloads
+            data = yf.Ticker(ticker).history(start=start_date, end=end_date, auto_adjust=True)
+            if not data.empty and 'Close' in data.columns:
+                val = data['Close']
+                if isinstance(val, (int, float, np.number)):
+                     val = pd.Series([val], index=data.index)
+                # history() returns an exchange-tz-aware index; match yf.download's
+                # tz-naive daily dates so the chunks can be aligned on one index
+                if val.index.tz is not None:
+                    val.index = val.index.tz_localize(None)
+                val.index = val.index.normalize()
+                return ticker, val
+        except Exception:
+            pass
+        return ticker, None
+
+    fallback_executor = None
+    fallback_futures = {}
+
     for chunk_idx, chunk in enumerate(chunked_iterable(tickers, BATCH_SIZE)):
         if progress_callback:
             progress_callback(chunk_idx * BATCH_SIZE, len(tickers), f"Fetching data for tickers {chunk_idx * BATCH_SIZE + 1}-{min((chunk_idx + 1) * BATCH_SIZE, len(tickers))}")
@@ -135,80 +250,57 @@ def get_stock_data(tickers, start_date, end_date, progress_callback=None):
         logger.info(f"GET_STOCK_DATA: Processing chunk {chunk_idx+1} ({len(chunk)} tickers)")
         chunk_data = pd.DataFrame()
         
-        # Try batch download for this chunk
+        # Try batch download for this chunk. yfinance already threads the
+        # per-ticker requests; the timeout bounds each HTTP request.
         try:
-            def _download_chunk():
-                return yf.download(chunk, start=start_date, end=end_date, progress=False, auto_adjust=True, threads=True)
-
-            with ThreadPoolExecutor(max_workers=1) as executor:
-                future = executor.submit(_download_chunk)
-                try:
-                    # 20 seconds timeout for a chunk of 50
-                    raw_data = future.result(timeout=20)
-                    
-                    # Extract Close data logic
-                    if len(chunk) == 1:
-                        if isinstance(raw_data.columns, pd.MultiIndex):
-                            c_data = raw_data['Close'] if 'Close' in raw_data.columns.get_level_values(0) else raw_data
-                        else:
-                            c_data = raw_data['Close'] if 'Close' in raw_data.columns else raw_data
-                        c_data.name = chunk[0]
-                        chunk_data = pd.DataFrame(c_data)
-                    else:
-                        if isinstance(raw_data.columns, pd.MultiIndex):
-                            if 'Close' in raw_data.columns.get_level_values(0):
-                                chunk_data = raw_data['Close']
-                            else:
-                                chunk_data = raw_data
-                        else:
-                            chunk_data = raw_data
-
-                    chunk_data = chunk_data.ffill().dropna(how='all')
-                    
-                except TimeoutError:
-                    logger.warning(f"GET_STOCK_DATA: Chunk {chunk_idx+1} timed out")
-                except Exception as e:
-                    logger.warning(f"GET_STOCK_DATA: Chunk {chunk_idx+1} failed: {e}")
-
-        except Exception as e:
-            logger.error(f"GET_STOCK_DATA: Chunk wrapper failed: {e}")
-
-        # Fallback for this chunk if batch failed or resulted in empty data
-        if chunk_data.empty:
-            logger.info(f"GET_STOCK_DATA: Fallback to individual fetch for chunk {chunk_idx+1}")
-            individual_data = {}
-            max_workers = min(32, len(chunk))
+            raw_data = yf.download(chunk, start=start_date, end=end_date, progress=False,
+                                   auto_adjust=True, threads=True, timeout=20)
             
-            def _fetch_single_safe(ticker):
-                try:
-                    data = yf.download(ticker, start=start_date, end=end_date, progress=False, auto_adjust=True)
-                    if not data.empty and 'Close' in data.columns:
-                        val = data['Close']
-                        if isinstance(val, (int, float, np.number)):
-                             val = pd.Series([val], index=data.index)
-                        return ticker, val
-                except Exception:
-                    pass
-                return ticker, None
-
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                future_to_ticker = {executor.submit(_fetch_single_safe, t): t for t in chunk}
-                for future in as_completed(future_to_ticker):
-                    t = future_to_ticker[future]
-                    try:
-                        r_tick, r_val = future.result(timeout=5)
-                        if r_val is not None:
-                            if isinstance(r_val, (int, float, str, bool, np.number)):
-                                continue
-                            individual_data[r_tick] = r_val
-                    except Exception:
-                        pass
+            # Extract Close data logic: a single cross-section of the
+            # (Price, Ticker) columns, or the flat 'Close' column
+            try:
+                chunk_data = raw_data.xs('Close', axis=1, level=0)
+            except (KeyError, TypeError):
+                chunk_data = raw_data[['Close']] if 'Close' in raw_data.columns else raw_data
+            if len(chunk) == 1 and chunk_data.shape[1] == 1:
+                chunk_data.columns = list(chunk)
+
+            # Forward-fill happens once on the combined frame below
+            chunk_data = chunk_data.dropna(how='all')
             
-            if individual_data:
-                chunk_data = pd.DataFrame(individual_data).ffill().dropna(how='all')
+        except Exception as e:
+            logger.warning(f"GET_STOCK_DATA: Chunk {chunk_idx+1} failed: {e}")
 
         if not chunk_data.empty:
              all_series.append(chunk_data)
+             continue
+
+        # Fallback for this chunk if batch failed or resulted in empty data.
+        # Individual fetches go to one shared pool and are collected after the
+        # chunk loop, so they overlap with the remaining batch downloads.
+        logger.info(f"GET_STOCK_DATA: Fallback to individual fetch for chunk {chunk_idx+1}")
+        if fallback_executor is None:
+            fallback_executor = ThreadPoolExecutor(max_workers=32)
+        for t in chunk:
+            fallback_futures[fallback_executor.submit(_fetch_single_safe, t)] = t
+
+    if fallback_executor is not None:
+        individual_data = {}
+        with fallback_executor:
+            for future in as_completed(fallback_futures):
+                try:
+                    r_tick, r_val = future.result()
+                    if r_val is not None:
+                        if isinstance(r_val, (int, float, str, bool, np.number)):
+                            continue
+                        individual_data[r_tick] = r_val
+                except Exception:
+                    pass
+        
+        if individual_data:
+            fallback_data = pd.DataFrame(individual_data).dropna(how='all')
+            if not fallback_data.empty:
+                all_series.append(fallback_data)
 
     # Combine all chunks
     if not all_series:
@@ -217,7 +309,19 @@ def get_stock_data(tickers, start_date, end_date, progress_callback=None):
         
     logger.info(f"GET_STOCK_DATA: Combining {len(all_series)} chunks")
     try:
-        final_data = pd.concat(all_series, axis=1)
+        # Align every chunk on the union of trading dates and write it into one
+        # preallocated block, then fill gaps in one pass
+        index = all_series[0].index
+        for chunk_data in all_series[1:]:
+            index = index.union(chunk_data.index)
+        columns = [ticker for chunk_data in all_series for ticker in chunk_data.columns]
+        values = np.full((len(index), len(columns)), np.nan)
+        col_start = 0
+        for chunk_data in all_series:
+            col_end = col_start + chunk_data.shape[1]
+            values[index.get_indexer(chunk_data.index), col_start:col_end] = chunk_data.to_numpy(dtype=np.float64)
+            col_start = col_end
+        final_data = pd.DataFrame(values, index=index, columns=columns)
         final_data = final_data.ffill().dropna(how='all')
         logger.info(f"GET_STOCK_DATA: Final shape: {final_data.shape}")
         return final_data
@@ -226,22 +330,16 @@ def get_stock_data(tickers, start_date, end_date, progress_callback=None):
         return pd.DataFrame()
 
 # NOTE: 모델 객체를 캐시하지 않음 - 메모리 누수 방지를 위해 forecast 결과만 캐시
-def _generate_ensemble_prediction(ticker, ticker_data):
+def _generate_ensemble_prediction(ticker, valid_prices):
     """
     Train ensemble models and generate prediction for a single ticker.
+    Expects the ticker's NaN-free price history.
     Returns dictionary with expected_return and uncertainty.
     """
     try:
-        prices = ticker_data.values
-        
         # Validate data
-        if len(prices) < 100:
-            logger.warning(f"Insufficient data for ML training on {ticker}: {len(prices)} points")
-            return None
-        
-        valid_prices = prices[~np.isnan(prices)]
         if len(valid_prices) < 100:
-            logger.warning(f"Too many NaN values for {ticker}")
+            logger.warning(f"Insufficient data for ML training on {ticker}: {len(valid_prices)} points")
             return None
         
         # Use EnsemblePredictor
@@ -261,40 +359,62 @@ def _generate_ensemble_prediction(ticker, ticker_data):
     except Exception as e:
         logger.error(f"Ensemble forecasting failed for {ticker}: {e}")
         return None
-    finally:
-        gc.collect()
 
-@cached(l1_ttl=900, l2_ttl=14400)  # 15 min L1, 4 hour L2 cache for predictions
-def _ml_forecast_single_ticker(ticker, ticker_data):
-    """Forecast returns for single ticker using Ensemble models with caching.
+def _ml_forecast_key_func(ticker, valid_prices):
+    """Generate cache key for a ticker forecast from its raw price buffer."""
+    valid_prices = np.ascontiguousarray(valid_prices, dtype=np.float64)
+    return f"ml_forecast_{ticker}_{hashlib.md5(valid_prices.tobytes()).hexdigest()}"
+
+def _ml_forecast_single_ticker(ticker, valid_prices):
+    """Forecast returns for single ticker using Ensemble models.
     
+    Not cached itself: ml_forecast_returns probes the forecast cache
+    (_ml_forecast_key_func) before dispatching and stores the result after,
+    so each miss is looked up once.
+    Expects the ticker's NaN-free price history; ml_forecast_returns strips
+    the gaps for all tickers in one pass before dispatching.
     Falls back to lightweight forecasting when insufficient data.
     Returns dictionary with expected_return and uncertainty.
     """
-    try:
-        prices = ticker_data.values
-        valid_prices = prices[~np.isnan(prices)]
-        
-        # Validate data - use lightweight mode if insufficient data for ML
-        if len(valid_prices) < 100:
-            logger.info(f"Using lightweight forecast for {ticker}: {len(valid_prices)} points (< 100 required for ML)")
-            forecast_value = lightweight_ensemble_forecast(valid_prices)
-            return ticker, {'expected_return': forecast_value, 'uncertainty': 0.05}
-        
-        # Generate ensemble prediction
-        prediction = _generate_ensemble_prediction(ticker, ticker_data)
-        
-        if prediction is None:
-            # Fallback to lightweight forecast
-            logger.warning(f"ML training failed for {ticker}, using lightweight forecast")
-            forecast_value = lightweight_ensemble_forecast(valid_prices)
-            return ticker, {'expected_return': forecast_value, 'uncertainty': 0.05}
-        
-        return ticker, prediction
-        
-    finally:
-        gc.collect()
+    # Validate data - use lightweight mode if insufficient data for ML
+    if len(valid_prices) < 100:
+        logger.info(f"Using lightweight forecast for {ticker}: {len(valid_prices)} points (< 100 required for ML)")
+        forecast_value = lightweight_ensemble_forecast(valid_prices)
+        return ticker, {'expected_return': forecast_value, 'uncertainty': 0.05}
+    
+    # Generate ensemble prediction
+    prediction = _generate_ensemble_prediction(ticker, valid_prices)
+    
+    if prediction is None:
+        # Fallback to lightweight forecast
+        logger.warning(f"ML training failed for {ticker}, using lightweight forecast")
+        forecast_value = lightweight_ensemble_forecast(valid_prices)
+        return ticker, {'expected_return': forecast_value, 'uncertainty': 0.05}
+    
+    return ticker, prediction
+
 
+# Worker-side handle on the price block shared by ml_forecast_returns.
+# Kept open for the lifetime of a forecasting run so each task only
+# pays for an index into the block.
+_shared_prices = {}
+
+def _ml_forecast_shared_ticker(ticker, shm_name, shape, row, n_valid):
+    """Worker entry point: read one ticker's prices from shared memory and forecast.
+    
+    Each row of the block holds a ticker's valid prices right-aligned, so the
+    history is simply the last ``n_valid`` entries.
+    """
+    shm = _shared_prices.get(shm_name)
+    if shm is None:
+        for stale in _shared_prices.values():
+            stale.close()
+        _shared_prices.clear()
+        shm = _shared_prices[shm_name] = shared_memory.SharedMemory(name=shm_name)
+    # 행 단위(티커별)로 연속 배치되어 있으므로 한 번의 memcpy로 복사
+    block = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    valid_prices = block[row, shape[1] - n_valid:].copy()
+    return _ml_forecast_single_ticker(ticker, valid_prices)
 
 
 def ml_forecast_returns(data, batch_size=50, progress_callback=None):
@@ -321,7 +441,12 @@ def ml_forecast_returns(data, batch_size=50, progress_callback=None):
     # Cap at 16 to prevent diminishing returns from excessive process management
     max_workers = min(usable_cores, len(data.columns), 16)
     
-    logger.info(f"Using {max_workers} parallel workers for ML forecasting (Optimized process pool)")
+    # Small universes: spawning workers (and importing the ML stack in each)
+    # costs more than the forecasts themselves, so run them on threads in-process
+    in_process = len(data.columns) <= 4
+    
+    logger.info(f"Using {max_workers} parallel workers for ML forecasting "
+                f"({'in-process threads' if in_process else 'Optimized process pool'})")
     
     import multiprocessing as mp
     from concurrent.futures import ProcessPoolExecutor, as_completed
@@ -333,70 +458,103 @@ def ml_forecast_returns(data, batch_size=50, progress_callback=None):
     uncertainties = {}
     tickers = list(data.columns)
     total_batches = (len(tickers) + batch_size - 1) // batch_size
+    cache = get_cache()
+    shm = None
+    
+    def _record_prediction(result_ticker, prediction_result):
+        # Handle old return type (float) vs new (dict) for safety during transition
+        if isinstance(prediction_result, dict):
+            forecasts[result_ticker] = prediction_result.get('expected_return', 0.05)
+            uncertainties[result_ticker] = prediction_result.get('uncertainty', 0.05)
+        else:
+            forecasts[result_ticker] = float(prediction_result)
+            uncertainties[result_ticker] = 0.05
     
     try:
-        # 배치 단위로 처리하여 메모리 관리
-        for batch_idx in range(total_batches):
-            batch_start = batch_idx * batch_size
-            batch_end = min(batch_start + batch_size, len(tickers))
-            batch_tickers = tickers[batch_start:batch_end]
-            
-            logger.info(f"Processing batch {batch_idx + 1}/{total_batches} ({len(batch_tickers)} tickers)")
-            
-            # ProcessPoolExecutor for true parallelism
-            with ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx, initializer=worker_initializer) as executor:
+        # Strip NaN gaps for every ticker in one pass: valid prices are moved
+        # to the end of each column, so a ticker's history is a plain slice
+        aligned, valid_counts = right_align(data.to_numpy(dtype=np.float64))
+        prices_matrix = np.ascontiguousarray(aligned.T)
+        n_dates = prices_matrix.shape[1]
+        column_index = {ticker: i for i, ticker in enumerate(tickers)}
+        
+        if in_process:
+            executor = ThreadPoolExecutor(max_workers=max_workers)
+        else:
+            # Copy the price matrix into shared memory once, ticker-major so each
+            # worker reads one contiguous row instead of unpickling a Series per task
+            shm = shared_memory.SharedMemory(create=True, size=max(1, prices_matrix.nbytes))
+            np.ndarray(prices_matrix.shape, dtype=np.float64, buffer=shm.buf)[:] = prices_matrix
+            # Persistent worker pool: process spawn and library imports are paid
+            # once; batches only bound memory cleanup and progress reporting
+            executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx, initializer=worker_initializer)
+        
+        with executor:
+            # 배치 단위로 처리하여 메모리 관리
+            for batch_idx in range(total_batches):
+                batch_start = batch_idx * batch_size
+                batch_end = min(batch_start + batch_size, len(tickers))
+                batch_tickers = tickers[batch_start:batch_end]
+                
+                logger.info(f"Processing batch {batch_idx + 1}/{total_batches} ({len(batch_tickers)} tickers)")
+                
+                # Probe the forecast cache here first: hits never reach the pool,
+                # so a warm run does not even spawn the workers
                 future_to_ticker = {}
                 for ticker in batch_tickers:
-                    future = executor.submit(_ml_forecast_single_ticker, ticker, data[ticker])
-                    future_to_ticker[future] = ticker
+                    row = column_index[ticker]
+                    n_valid = int(valid_counts[row])
+                    valid_prices = prices_matrix[row, n_dates - n_valid:]
+                    cache_key = _ml_forecast_key_func(ticker, valid_prices)
+                    hit = cache.get(cache_key)
+                    if hit is not None:
+                        _record_prediction(*hit)
+                        continue
+                    if in_process:
+                        future = executor.submit(_ml_forecast_single_ticker, ticker, valid_prices)
+                    else:
+                        future = executor.submit(_ml_forecast_shared_ticker, ticker, shm.name,
+                                                 prices_matrix.shape, row, n_valid)
+                    future_to_ticker[future] = (ticker, cache_key)
                 
                 for future in as_completed(future_to_ticker):
-                    ticker = future_to_ticker[future]
+                    ticker, cache_key = future_to_ticker[future]
                     try:
-                        result_ticker, prediction_result = future.result()
-                        # Handle old return type (float) vs new (dict) for safety during transition
-                        if isinstance(prediction_result, dict):
-                            forecasts[result_ticker] = prediction_result.get('expected_return', 0.05)
-                            uncertainties[result_ticker] = prediction_result.get('uncertainty', 0.05)
-                        else:
-                            forecasts[result_ticker] = float(prediction_result)
-                            uncertainties[result_ticker] = 0.05
+                        result = future.result()
+                        cache.set(cache_key, result, 900, 14400)  # 15 min L1, 4 hour L2 cache for predictions
+                        _record_prediction(*result)
                     except Exception as exc:
                         logger.error(f"ML forecasting exception for {ticker}: {exc}")
                         forecasts[ticker] = 0.08
                         uncertainties[ticker] = 0.05
-            
-            # 배치 완료 후 메모리 정리
-            gc.collect()
-            
-            # 진행 상황 로깅
-            completed = len(forecasts)
-            logger.info(f"Batch {batch_idx + 1} complete. Total progress: {completed}/{len(tickers)} ({100*completed/len(tickers):.1f}%)")
-            
-            if progress_callback:
-                progress_callback(completed, len(tickers), f"ML Training: Batch {batch_idx + 1}/{total_batches} complete")
-
-            # 메모리 상태 체크
-            import psutil
-            mem = psutil.virtual_memory()
-            logger.info(f"Memory usage: {mem.percent:.1f}% ({mem.used / 1024**3:.1f}GB / {mem.total / 1024**3:.1f}GB)")
-            
-            # 메모리 사용량이 85% 이상이면 경고 및 추가 정리
-            if mem.percent > 85:
-                logger.warning(f"High memory usage detected ({mem.percent:.1f}%). Forcing garbage collection.")
+                
+                # 배치 완료 후 메모리 정리
                 gc.collect()
-                # Keras/TensorFlow 세션 정리 시도
-                try:
-                    import tensorflow as tf
-                    tf.keras.backend.clear_session()
-                except Exception:
-                    pass
+                
+                # 진행 상황 로깅
+                completed = len(forecasts)
+                logger.info(f"Batch {batch_idx + 1} complete. Total progress: {completed}/{len(tickers)} ({100*completed/len(tickers):.1f}%)")
+                
+                if progress_callback:
+                    progress_callback(completed, len(tickers), f"ML Training: Batch {batch_idx + 1}/{total_batches} complete")
+
+                # 메모리 상태 체크
+                mem = psutil.virtual_memory()
+                logger.info(f"Memory usage: {mem.percent:.1f}% ({mem.used / 1024**3:.1f}GB / {mem.total / 1024**3:.1f}GB)")
+                
+                # 메모리 사용량이 85% 이상이면 경고 및 추가 정리
+                if mem.percent > 85:
+                    logger.warning(f"High memory usage detected ({mem.percent:.1f}%). Forcing garbage collection.")
+                    gc.collect()
+                    # PyTorch CUDA 캐시 정리 시도 (이 프로세스에 이미 로드된 경우에만)
+                    torch = sys.modules.get("torch")
+                    if torch is not None and torch.cuda.is_available():
+                        torch.cuda.empty_cache()
         
         elapsed_time = time.time() - start_time
         logger.info(f"BATCH ML forecasting completed in {elapsed_time:.2f}s for {len(forecasts)} tickers")
         
         # Log cache performance
-        cache = get_cache()
         cache_stats = cache.stats()
         logger.info(f"CACHE HIT RATES: L1={cache_stats['hit_ratios']['l1']:.1%}, "
                    f"L2={cache_stats['hit_ratios']['l2']:.1%}, "
@@ -406,73 +564,115 @@ def ml_forecast_returns(data, batch_size=50, progress_callback=None):
         
     except Exception as e:
         logger.error(f"ML forecasting failed critically: {e}. Using lightweight ensemble fallback.")
-        # Fallback: 경량 앙상블 방식으로 직접 예측
-        forecasts = {}
-        uncertainties = {}
-        for ticker in data.columns:
-            try:
-                prices = data[ticker].values
-                valid_prices = prices[~np.isnan(prices)]
-                if len(valid_prices) >= 10:
-                    val = lightweight_ensemble_forecast(valid_prices)
-                    forecasts[ticker] = val
-                    uncertainties[ticker] = 0.05
-                else:
-                    forecasts[ticker] = 0.05
-                    uncertainties[ticker] = 0.05
-            except Exception:
-                forecasts[ticker] = 0.05
-                uncertainties[ticker] = 0.05
-        return pd.Series(forecasts), pd.Series(uncertainties)
+        # Fallback: 경량 앙상블 방식으로 직접 예측 (전체 종목 한 번에 벡터 연산)
+        forecasts = lightweight_ensemble_forecast_batch(data.to_numpy(dtype=np.float64))
+        return pd.Series(forecasts, index=data.columns), pd.Series(0.05, index=data.columns)
+    finally:
+        if shm is not None:
+            shm.close()
+            shm.unlink()
 
 
-@cached(l1_ttl=86400, l2_ttl=604800)  # 24 hours L1, 7 days L2 (Market caps change slowly)
 def get_market_caps(tickers):
-    """Fetch market capitalizations for tickers using yfinance."""
+    """Fetch market capitalizations for tickers using yfinance.
+    
+    Complete lookups are cached (24 hours L1, 7 days L2; market caps change
+    slowly). A lookup cut short by the timeout or a failure is returned but not
+    cached, so missing tickers are not pinned at zero market weight for a week.
+    """
+    cache = get_cache()
+    cache_key = f"get_market_caps_{hashlib.md5(','.join(tickers).encode()).hexdigest()}"
+    mcaps = cache.get(cache_key)
+    if mcaps is not None:
+        return mcaps
+
+    mcaps, complete = _fetch_market_caps(tickers)
+    if complete:
+        cache.set(cache_key, mcaps, 86400, 604800)
+    else:
+        logger.warning("Market cap lookup incomplete; not caching it")
+    return mcaps
+
+
+def _fetch_market_caps(tickers):
+    """Uncached body of get_market_caps.
+    
+    Returns:
+        tuple: (market caps by ticker, whether every lookup finished in time)
+    """
     mcaps = {}
+    complete = False
     try:
         logger.info(f"Fetching market caps for {len(tickers)} tickers")
-        batch_size = 50
-        for i in range(0, len(tickers), batch_size):
-            batch = tickers[i:i+batch_size]
+        yf_tickers = yf.Tickers(" ".join(tickers))
+
+        def _fetch_market_cap(ticker):
+            # fast_info avoids the full quoteSummary scrape behind .info
+            ticker_obj = yf_tickers.tickers[ticker]
+            fast_info = ticker_obj.fast_info
+            mc = fast_info.get("market_cap")
+            if not mc:
+                last_price = fast_info.get("last_price")
+                shares = fast_info.get("shares")
+                if last_price and shares:
+                    mc = last_price * shares
+            if not mc:
+                # ETFs/funds expose no share count; only .info has their assets
+                mc = ticker_obj.info.get("totalAssets")
+            return mc
+
+        max_workers = min(32, max(1, len(tickers)))
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            future_to_ticker = {executor.submit(_fetch_market_cap, t): t for t in tickers}
             try:
-                tickers_str = " ".join(batch)
-                yf_tickers = yf.Tickers(tickers_str)
-                for ticker in batch:
+                # Bound the whole fan-out: a hung lookup must not stall the request
+                for future in as_completed(future_to_ticker, timeout=30):
+                    ticker = future_to_ticker[future]
                     try:
-                        # info access can be slow.
-                        info = yf_tickers.tickers[ticker].info
-                        mc = info.get("marketCap") or info.get("totalAssets")
+                        mc = future.result()
                         if mc:
                             mcaps[ticker] = float(mc)
                     except Exception:
                         pass
-            except Exception as e:
-                logger.error(f"Batch info fetch failed: {e}")
+                complete = True
+            except FuturesTimeoutError:
+                n_pending = sum(not f.done() for f in future_to_ticker)
+                logger.warning(f"Market cap fetch timed out for {n_pending} tickers")
+        finally:
+            # Don't wait on hung lookups; they are left to finish in the background
+            executor.shutdown(wait=False, cancel_futures=True)
     except Exception as e:
         logger.error(f"Market cap fetch failed: {e}")
-    return mcaps
+    return mcaps, complete
+
+
+@cached(l1_ttl=3600, l2_ttl=86400)  # 일별 종가 기준이므로 하루 단위로 캐시
+def _get_market_index_prices(ticker, start_date, end_date):
+    """Fetch the Close series of a market index (e.g. ^GSPC)."""
+    market_data = yf.download(ticker, start=start_date, end=end_date, progress=False, auto_adjust=True)
+    try:
+        market_prices = market_data.xs('Close', axis=1, level=0)
+    except (KeyError, TypeError):
+        market_prices = market_data['Close'] if 'Close' in market_data.columns else market_data
+    if isinstance(market_prices, pd.DataFrame):
+        market_prices = market_prices.iloc[:, 0]
+    return market_prices.dropna()
+
 
+def _risk_aversion_key_func(start_date, end_date, risk_free_rate):
+    """Generate cache key for delta, normalizing str/datetime dates and float noise in the rate."""
+    start_str = pd.Timestamp(start_date).date().isoformat()
+    end_str = pd.Timestamp(end_date).date().isoformat()
+    return f"risk_aversion_{start_str}_{end_str}_{round(float(risk_free_rate), 6)}"
 
-@cached(l1_ttl=3600, l2_ttl=86400)
+@cached(l1_ttl=3600, l2_ttl=86400, key_func=_risk_aversion_key_func)
 def get_market_implied_risk_aversion_cached(start_date, end_date, risk_free_rate):
     """Calculate market implied risk aversion (delta) for S&P 500."""
     market_ticker = "^GSPC"
     try:
-        # Use simple caching for standard S&P500 fetch
-        market_data = yf.download(market_ticker, start=start_date, end=end_date, progress=False, auto_adjust=True)
-        
-        if isinstance(market_data.columns, pd.MultiIndex): 
-            if 'Close' in market_data.columns.get_level_values(0):
-                    market_prices = market_data['Close']
-            else:
-                    market_prices = market_data.iloc[:, 0]
-        elif 'Close' in market_data.columns:
-            market_prices = market_data['Close']
-        else:
-            market_prices = market_data.iloc[:, 0]
-
-        market_prices = market_prices.dropna()
+        # Index prices are cached separately so a new risk-free rate reuses them
+        market_prices = _get_market_index_prices(market_ticker, start_date, end_date)
         
         if market_prices.empty:
                 return 2.5
@@ -485,10 +685,119 @@ def get_market_implied_risk_aversion_cached(start_date, end_date, risk_free_rate
         return 2.5
 
 
-@cached(l1_ttl=600, l2_ttl=3600)  # 10 min L1, 1 hour L2 cache for portfolio optimization
+def _cov_array(S, tickers):
+    """Covariance as a float64 ndarray ordered by tickers.
+    
+    Skips the pandas .loc realignment in the usual case where S already
+    comes out of the pipeline in ticker order.
+    """
+    if S.index.equals(pd.Index(tickers)) and S.columns.equals(S.index):
+        return S.to_numpy(dtype=np.float64)
+    return S.loc[tickers, tickers].to_numpy(dtype=np.float64)
+
+
+def _black_litterman_posterior(S_arr, pi, views, view_var, tau=0.05):
+    """Black-Litterman posterior for one absolute view per asset (P = I).
+    
+    Omega is diagonal, so it is never materialized: the view variances are
+    added straight onto the diagonal of tau*S, and a single Cholesky factor
+    of A = tau*S + Omega serves both the return and covariance solves.
+    
+    Args:
+        S_arr: (N, N) prior covariance
+        pi: (N,) prior (market-implied) returns
+        views: (N,) absolute views on each asset
+        view_var: (N,) view variances, i.e. diag(Omega)
+        tau: weight-on-views scalar
+    
+    Returns:
+        tuple: (posterior returns (N,), posterior covariance (N, N))
+    """
+    tau_S = tau * S_arr
+    A = tau_S.copy()
+    A[np.diag_indices_from(A)] += view_var
+    rhs = np.column_stack((views - pi, tau_S))
+    try:
+        solution = cho_solve(cho_factor(A), rhs)
+    except np.linalg.LinAlgError:
+        solution = np.linalg.lstsq(A, rhs, rcond=None)[0]
+    post_mu = pi + tau_S @ solution[:, 0]
+    M = tau_S - tau_S @ solution[:, 1:]
+    return post_mu, S_arr + 0.5 * (M + M.T)
+
+
+def _ledoit_wolf_key_func(prices_df):
+    """Generate cache key for the covariance estimate from tickers, date window and prices.
+    
+    The price bytes are part of the key so revised or re-adjusted prices over
+    the same window do not reuse a stale covariance.
+    """
+    tickers_str = ",".join(map(str, prices_df.columns))
+    key_str = f"{tickers_str}|{prices_df.index[0]}|{prices_df.index[-1]}|{len(prices_df)}"
+    key_hash = hashlib.md5(key_str.encode())
+    key_hash.update(np.ascontiguousarray(prices_df.to_numpy(dtype=np.float64)).tobytes())
+    return f"ledoit_wolf_{key_hash.hexdigest()}"
+
+@cached(l1_ttl=3600, l2_ttl=86400, key_func=_ledoit_wolf_key_func)
+def _ledoit_wolf_cov(prices_df):
+    """Annualized Ledoit-Wolf shrunk covariance of daily log returns.
+    
+    Runs sklearn's estimator directly on a contiguous float64 array instead of
+    going through pypfopt's DataFrame-based CovarianceShrinkage.
+    """
+    from sklearn.covariance import LedoitWolf
+    arr = prices_df.to_numpy(dtype=np.float64)
+    log_returns = np.log(arr[1:] / arr[:-1])
+    # Keep the estimator on a dense, finite block; gaps left by upstream cleaning
+    # would otherwise make sklearn reject the whole input
+    finite_rows = np.isfinite(log_returns).all(axis=1)
+    if not finite_rows.all():
+        logger.warning(f"Ledoit-Wolf: dropping {int((~finite_rows).sum())} non-finite return rows")
+        log_returns = log_returns[finite_rows]
+    cov = LedoitWolf().fit(log_returns).covariance_ * 252
+    return pd.DataFrame(cov, index=prices_df.columns, columns=prices_df.columns)
+
+
+@njit(cache=True)
+def _historical_cagr(prices):
+    """Per-column CAGR from the first/last valid price and valid-point count.
+    
+    One forward and one backward scan per column instead of building full
+    (T, N) masks. Columns with fewer than 2 prices get 0.0; non-positive
+    endpoints get -0.99.
+    """
+    n_rows, n_cols = prices.shape
+    cagr = np.empty(n_cols)
+    for j in range(n_cols):
+        count = 0
+        first = -1
+        for i in range(n_rows):
+            if not np.isnan(prices[i, j]):
+                if first < 0:
+                    first = i
+                count += 1
+        if count < 2:
+            cagr[j] = 0.0
+            continue
+        last = n_rows - 1
+        while np.isnan(prices[last, j]):
+            last -= 1
+        start_price = prices[first, j]
+        end_price = prices[last, j]
+        if start_price > 0 and end_price > 0:
+            cagr[j] = (end_price / start_price) ** (252.0 / count) - 1
+        else:
+            cagr[j] = -0.99
+    return cagr
+
 
 def _pipeline_key_func(start_date, end_date, ticker_group, tickers, forecast_method, progress_callback=None):
     """Generate cache key for pipeline, excluding progress callback."""
+    return _pipeline_key(start_date, end_date, ticker_group, tuple(tickers) if tickers else None, forecast_method)
+
+@lru_cache(maxsize=256)
+def _pipeline_key(start_date, end_date, ticker_group, tickers, forecast_method):
+    """Memoized body of _pipeline_key_func: the join and MD5 run once per distinct request."""
     if tickers:
         tickers_str = ",".join(sorted(tickers))
     else:
@@ -591,46 +900,18 @@ def data_and_forecast_pipeline(start_date, end_date, ticker_group, tickers, fore
     
     if forecast_method in ["HISTORICAL", "MPT", "CLASSIC_MPT"]:
         logger.info("Using Historical CAGR for Forecasting")
-        cagr_series = {}
-        for ticker in final_tickers:
-            try:
-                prices = data[ticker].dropna()
-                if len(prices) >= 2:
-                    start_price = prices.iloc[0]
-                    end_price = prices.iloc[-1]
-                    years = len(prices) / 252.0
-                    cagr = (end_price / start_price) ** (1 / years) - 1 if (start_price>0 and end_price>0 and years>0) else -0.99
-                    cagr_series[ticker] = cagr
-                else:
-                    cagr_series[ticker] = 0.0
-            except Exception:
-                cagr_series[ticker] = 0.0
-        mu_forecast = pd.Series(cagr_series).fillna(0)
+        cagr = _historical_cagr(data[final_tickers].to_numpy(dtype=np.float64))
+        mu_forecast = pd.Series(cagr, index=final_tickers).fillna(0)
         # Fix for NoneType error: Ensure uncertainties is initialized for HISTORICAL mode
-        uncertainties = pd.Series({t: 0.0 for t in final_tickers})
+        uncertainties = pd.Series(0.0, index=final_tickers)
     
     elif forecast_method in ["LIGHTWEIGHT", "Lightweight"]:
         logger.info("Using Lightweight Ensemble Forecast")
-        forecasts = {}
-        uncertainties_dict = {}
-        for i, ticker in enumerate(final_tickers):
-            if i % 10 == 0:
-                ml_callback(i, len(final_tickers), f"Lightweight forecasting {i}/{len(final_tickers)}")
-            try:
-                prices = data[ticker].dropna().values
-                valid_prices = prices[~np.isnan(prices)]
-                if len(valid_prices) > 0:
-                    val = lightweight_ensemble_forecast(valid_prices)
-                else:
-                    val = 0.05
-                forecasts[ticker] = val
-                uncertainties_dict[ticker] = 0.05
-            except Exception:
-                forecasts[ticker] = 0.05
-                uncertainties_dict[ticker] = 0.05
-        
-        mu_forecast = pd.Series(forecasts).fillna(0.0)
-        uncertainties = pd.Series(uncertainties_dict).fillna(0.05)
+        ml_callback(0, len(final_tickers), f"Lightweight forecasting {len(final_tickers)} tickers")
+        # One vectorized pass over the whole (dates x tickers) block
+        forecasts = lightweight_ensemble_forecast_batch(data[final_tickers].to_numpy(dtype=np.float64))
+        mu_forecast = pd.Series(forecasts, index=final_tickers).fillna(0.0)
+        uncertainties = pd.Series(0.05, index=final_tickers)
         
     elif forecast_method in ["DEEP_LEARNING", "Ensemble"]:
         logger.info("Using Deep Learning Ensemble Forecast")
@@ -638,16 +919,9 @@ def data_and_forecast_pipeline(start_date, end_date, ticker_group, tickers, fore
     
     else:
         logger.warning(f"Unknown forecast method '{forecast_method}', defaulting to Lightweight")
-        forecasts = {}
-        uncertainties_dict = {}
-        for ticker in final_tickers:
-            prices = data[ticker].dropna().values
-            valid_prices = prices[~np.isnan(prices)]
-            val = lightweight_ensemble_forecast(valid_prices) if len(valid_prices)>0 else 0.05
-            forecasts[ticker] = val
-            uncertainties_dict[ticker] = 0.05
-        mu_forecast = pd.Series(forecasts).fillna(0.0)
-        uncertainties = pd.Series(uncertainties_dict).fillna(0.05)
+        forecasts = lightweight_ensemble_forecast_batch(data[final_tickers].to_numpy(dtype=np.float64))
+        mu_forecast = pd.Series(forecasts, index=final_tickers).fillna(0.0)
+        uncertainties = pd.Series(0.05, index=final_tickers)
 
     # DEBUG: Check Forecasts
     if mu_forecast is not None:
@@ -664,55 +938,36 @@ def data_and_forecast_pipeline(start_date, end_date, ticker_group, tickers, fore
     # DEBUG: Check aligned data before covariance
     logger.info(f"DEBUG: aligned_data shape: {aligned_data.shape}")
     
-    # 1. Replace 0.0 with NaN (Price of 0 causes Division by Zero in returns)
-    aligned_data = aligned_data.replace(0.0, np.nan)
+    # 1. Mark 0.0 (Division by Zero in returns) and INF prices as gaps in one mask
+    values = aligned_data.to_numpy(dtype=np.float64, copy=True)
+    values[(values == 0.0) | ~np.isfinite(values)] = np.nan
     
     # 2. Fill gaps (Forward fill then Backward fill)
-    aligned_data = aligned_data.ffill().bfill()
+    aligned_data = pd.DataFrame(values, index=aligned_data.index, columns=aligned_data.columns).ffill().bfill()
     
-    # 3. Check for specific bad values
-    if np.isinf(aligned_data.values).any():
-         logger.error("DEBUG: aligned_data contains INF values even after cleanup!")
-         aligned_data = aligned_data.replace([np.inf, -np.inf], np.nan).dropna(axis=1)
-
-    # 4. Check for remaining NaNs and drop columns (tickers) that are broken
-    if aligned_data.isna().any().any():
-        logger.warning("DEBUG: aligned_data contains NaNs. Dropping bad columns.")
-        aligned_data = aligned_data.dropna(axis=1)
-
-    # Ensure no large values in aligned_data (Price data)
-    cols_to_drop = []
-    for col in aligned_data.columns:
-        if aligned_data[col].max() > 1e8: 
-            logger.warning(f"DEBUG: Dropping {col} due to suspicious price > 1e8: {aligned_data[col].max()}")
-            cols_to_drop.append(col)
+    # 3. Flag broken tickers in one pass: NaN left after filling (no valid
+    #    price at all), or suspicious prices > 1e8
+    values = aligned_data.to_numpy()
+    bad_mask = np.isnan(values).any(axis=0) | (np.max(values, axis=0, initial=-np.inf) > 1e8)
+    if bad_mask.any():
+        logger.warning(f"DEBUG: Dropping {int(bad_mask.sum())} tickers with no valid prices or prices > 1e8: "
+                       f"{list(aligned_data.columns[bad_mask])}")
     
     # Re-align everything based on the survived columns
-    valid_columns = [c for c in aligned_data.columns if c not in cols_to_drop]
-    aligned_data = aligned_data[valid_columns]
-    
-    # Ensure mu_forecast and uncertainties match the valid columns
-    common_tickers = [t for t in mu_forecast.index if t in valid_columns]
-    
-    aligned_data = aligned_data[common_tickers]
-    mu_forecast = mu_forecast[common_tickers]
-    uncertainties = uncertainties[common_tickers]
-    final_tickers = common_tickers
+    aligned_data = aligned_data.loc[:, ~bad_mask]
+    final_tickers = list(aligned_data.columns)
+    mu_forecast = mu_forecast[final_tickers]
+    uncertainties = uncertainties[final_tickers]
 
     if aligned_data.empty:
         logger.error("All tickers were dropped due to data quality issues.")
         raise ValueError("No valid data remaining after sanitization.")
 
-    S_hist = risk_models.CovarianceShrinkage(aligned_data).ledoit_wolf()
+    S_hist = _ledoit_wolf_cov(aligned_data)
     
-    latest_prices = {}
-    for ticker in final_tickers:
-        try:
-            series = data[ticker].dropna()
-            if not series.empty:
-                latest_prices[ticker] = float(series.iloc[-1])
-        except Exception:
-            pass
+    # aligned_data is already filled and NaN-free over final_tickers,
+    # so its last row is the latest valid close per ticker
+    latest_prices = aligned_data.iloc[-1].astype(float).to_dict()
             
     return {
         "mu": mu_forecast,
@@ -722,6 +977,250 @@ def data_and_forecast_pipeline(start_date, end_date, ticker_group, tickers, fore
         "latest_prices": latest_prices
     }
 
+# Solvers tried in order for the small dense portfolio QPs. Clarabel's
+# interior-point method converges in few iterations at this size; None
+# falls back to CVXPY's default selection.
+SOLVER_PREFERENCE = [
+    ("CLARABEL", {"tol_gap_abs": 1e-7, "tol_gap_rel": 1e-7, "max_iter": 200}),
+    ("ECOS", {}),
+    (None, {}),
+]
+
+
+def _available_solvers():
+    """SOLVER_PREFERENCE filtered to the solvers installed with CVXPY."""
+    installed = set(cp.installed_solvers())
+    return [(name, options) for name, options in SOLVER_PREFERENCE
+            if name is None or name in installed]
+
+
+# Parametrized portfolio problems keyed on asset count. CVXPY canonicalizes
+# each one once; later solves only swap parameter values and warm-start.
+_max_sharpe_problems = {}
+_frontier_problems = {}
+_problem_lock = threading.Lock()
+
+
+def _get_max_sharpe_problem(n_assets):
+    """Return the cached max-Sharpe problem for n_assets, building it on first use.
+    
+    Same formulation as pypfopt's EfficientFrontier.max_sharpe (Cornuejols-Tutuncu
+    variable transform with scale k) plus an L2 term, with mu, the covariance
+    square root and the weight cap as cp.Parameters. The L2 term is folded into
+    the quadratic: cov_root is a square root of S + gamma*I, since
+    w'Sw + gamma*||w||^2 == w'(S + gamma*I)w.
+    """
+    problem = _max_sharpe_problems.get(n_assets)
+    if problem is None:
+        w = cp.Variable(n_assets)
+        k = cp.Variable()
+        cov_root = cp.Parameter((n_assets, n_assets))
+        excess_returns = cp.Parameter(n_assets)
+        max_weight = cp.Parameter(nonneg=True)
+
+        objective = cp.Minimize(cp.sum_squares(cov_root @ w))
+        constraints = [
+            excess_returns @ w == 1,
+            cp.sum(w) == k,
+            k >= 0,
+            w >= 0,
+            w <= max_weight * k,
+        ]
+        problem = {
+            "problem": cp.Problem(objective, constraints),
+            "w": w,
+            "k": k,
+            "cov_root": cov_root,
+            "excess_returns": excess_returns,
+            "max_weight": max_weight,
+        }
+        _max_sharpe_problems[n_assets] = problem
+    return problem
+
+
+def _solve_max_sharpe(tickers, mu_arr, S_arr, risk_free_rate, max_asset_weight, l2_gamma):
+    """Max-Sharpe weights with long-only box constraints and L2 regularization.
+    
+    Args:
+        tickers: Asset names, in the order of mu_arr and S_arr
+        mu_arr: (N,) expected returns
+        S_arr: (N, N) covariance
+    
+    Returns:
+        tuple: (cleaned weights dict, (return, volatility, sharpe))
+    """
+    if not (mu_arr > risk_free_rate).any():
+        raise ValueError("at least one of the assets must have an expected return exceeding the risk-free rate")
+
+    # Square root of S so the objective stays DPP: ||R w||^2 == w' S w.
+    # Re-symmetrize first: eigh only reads one triangle, and the BL posterior
+    # covariance is symmetric only up to rounding.
+    S_arr = 0.5 * (S_arr + S_arr.T)
+    excess_returns = mu_arr - risk_free_rate
+
+    # Closed-form tangency portfolio: without the sign/cap constraints the
+    # optimum is (S + gamma*I)^-1 (mu - rf), normalized. When that already
+    # satisfies 0 <= w <= max_weight it is also the constrained optimum, so
+    # the QP is only needed when a constraint binds.
+    try:
+        tangency = cho_solve(cho_factor(S_arr + l2_gamma * np.eye(len(tickers))), excess_returns)
+        scale = tangency.sum()
+        tangency = tangency / scale
+        if scale > 0 and np.all(tangency >= -1e-10) and np.all(tangency <= max_asset_weight + 1e-10):
+            return _portfolio_result(tickers, np.clip(tangency, 0, None), mu_arr, S_arr, risk_free_rate)
+    except np.linalg.LinAlgError:
+        pass  # S + gamma*I not positive definite; leave it to the solver
+
+    # Root of S + gamma*I: shifting the eigenvalues folds in the L2 term
+    eigvals, eigvecs = np.linalg.eigh(S_arr)
+    cov_root = np.sqrt(np.clip(eigvals + l2_gamma, 0, None))[:, None] * eigvecs.T
+
+    with _problem_lock:
+        p = _get_max_sharpe_problem(len(tickers))
+        p["cov_root"].value = cov_root
+        p["excess_returns"].value = excess_returns
+        p["max_weight"].value = max_asset_weight
+        status = _solve_with_fallback(p["problem"])
+        w = p["w"].value
+        k = p["k"].value
+
+    if status not in ("optimal", "optimal_inaccurate") or w is None:
+        raise OptimizationError("Please check your objectives/constraints or use a different solver.")
+
+    return _portfolio_result(tickers, w / k, mu_arr, S_arr, risk_free_rate)
+
+
+def _get_frontier_problem(kind, n_assets):
+    """Return the cached efficient-frontier problem for n_assets, building it on first use.
+    
+    kind "return" is EfficientFrontier.efficient_return (minimum variance for a
+    return floor), kind "risk" is efficient_risk (maximum return under a variance
+    cap); both with the L2 objective and long-only weight cap as in
+    optimize_portfolio. The target is a cp.Parameter like the market data.
+    
+    For kind "return" the L2 term is folded into the quadratic as in
+    _get_max_sharpe_problem (cov_root is a root of S + gamma*I). For kind
+    "risk" the variance cap must see S alone, so gamma stays a parameter.
+    """
+    problem = _frontier_problems.get((kind, n_assets))
+    if problem is None:
+        w = cp.Variable(n_assets)
+        cov_root = cp.Parameter((n_assets, n_assets))
+        expected_returns = cp.Parameter(n_assets)
+        max_weight = cp.Parameter(nonneg=True)
+        target = cp.Parameter(nonneg=(kind == "risk"))
+        problem = {
+            "w": w,
+            "cov_root": cov_root,
+            "expected_returns": expected_returns,
+            "max_weight": max_weight,
+            "target": target,
+        }
+
+        constraints = [cp.sum(w) == 1, w >= 0, w <= max_weight]
+        if kind == "return":
+            objective = cp.Minimize(cp.sum_squares(cov_root @ w))
+            constraints.append(expected_returns @ w >= target)
+        else:
+            problem["gamma"] = cp.Parameter(nonneg=True)
+            objective = cp.Minimize(-(expected_returns @ w) + problem["gamma"] * cp.sum_squares(w))
+            constraints.append(cp.sum_squares(cov_root @ w) <= target)
+        problem["problem"] = cp.Problem(objective, constraints)
+        _frontier_problems[(kind, n_assets)] = problem
+    return problem
+
+
+def _solve_efficient_frontier(tickers, mu_arr, S_arr, risk_free_rate, max_asset_weight, l2_gamma,
+                              target_return=None, target_volatility=None):
+    """Efficient-return (if target_return is given) or efficient-risk weights.
+    
+    Applies the same input checks as pypfopt's efficient_return/efficient_risk.
+    Arrays are laid out as in _solve_max_sharpe.
+    
+    Returns:
+        tuple: (cleaned weights dict, (return, volatility, sharpe))
+    """
+    S_arr = 0.5 * (S_arr + S_arr.T)
+
+    if target_return is not None:
+        if not isinstance(target_return, float):
+            raise ValueError("target_return should be a float")
+        # Highest attainable return under the weight cap: fill the best assets first
+        allocation = np.diff(np.minimum(np.cumsum(np.full(len(tickers), max_asset_weight)), 1.0), prepend=0.0)
+        if allocation.sum() < 1 - 1e-9:
+            raise OptimizationError("Please check your objectives/constraints or use a different solver.")
+        if target_return > np.sort(mu_arr)[::-1] @ allocation:
+            raise ValueError("target_return must be lower than the maximum possible return")
+        kind, target = "return", target_return
+    else:
+        if not isinstance(target_volatility, (float, int)) or target_volatility < 0:
+            raise ValueError("target_volatility should be a positive float")
+        global_min_volatility = np.sqrt(1 / np.sum(np.linalg.pinv(S_arr)))
+        if target_volatility < global_min_volatility:
+            raise ValueError(
+                "The minimum volatility is {:.3f}. Please use a higher target_volatility".format(
+                    global_min_volatility
+                )
+            )
+        kind, target = "risk", target_volatility ** 2
+
+    eigvals, eigvecs = np.linalg.eigh(S_arr)
+    if kind == "return":
+        eigvals = eigvals + l2_gamma  # fold the L2 term into the quadratic
+    cov_root = np.sqrt(np.clip(eigvals, 0, None))[:, None] * eigvecs.T
+
+    with _problem_lock:
+        p = _get_frontier_problem(kind, len(tickers))
+        p["cov_root"].value = cov_root
+        p["expected_returns"].value = mu_arr
+        if kind == "risk":
+            p["gamma"].value = l2_gamma
+        p["max_weight"].value = max_asset_weight
+        p["target"].value = target
+        status = _solve_with_fallback(p["problem"])
+        w = p["w"].value
+
+    if status not in ("optimal", "optimal_inaccurate") or w is None:
+        raise OptimizationError("Please check your objectives/constraints or use a different solver.")
+
+    return _portfolio_result(tickers, w, mu_arr, S_arr, risk_free_rate)
+
+
+def _solve_with_fallback(problem):
+    """Solve a cached problem with the first installed solver that does not error out.
+    
+    Returns:
+        str: the problem status from this solve
+    
+    Raises:
+        cp.error.SolverError: if every solver errors out. The cached problem still
+            holds the previous request's status and values, so they must not be read.
+    """
+    for solver, solver_options in _available_solvers():
+        try:
+            problem.solve(solver=solver, warm_start=True, **solver_options)
+            return problem.status
+        except cp.error.SolverError as e:
+            logger.warning(f"Solver {solver or 'default'} failed: {e}. Trying next solver.")
+    raise cp.error.SolverError("All installed solvers failed on this problem.")
+
+
+def _portfolio_result(tickers, raw_weights, mu_arr, S_arr, risk_free_rate):
+    """Performance triple and cleaned weights dict for an optimized portfolio.
+    
+    Weights get the same rounding as EfficientFrontier.clean_weights(), and
+    only assets left above 1e-4 after rounding are kept in the dict.
+    """
+    port_return = float(raw_weights @ mu_arr)
+    port_volatility = float(np.sqrt(raw_weights @ S_arr @ raw_weights))
+    sharpe = (port_return - risk_free_rate) / port_volatility
+
+    cleaned = np.where(np.abs(raw_weights) < 1e-4, 0.0, raw_weights).round(5)
+    keep = np.flatnonzero(cleaned > 1e-4)
+    weights = dict(zip([tickers[i] for i in keep], cleaned[keep].tolist()))
+    return weights, (port_return, port_volatility, sharpe)
+
+
 def optimize_portfolio(start_date, end_date, risk_free_rate, ticker_group=None, tickers=None,
                        target_return=None, risk_tolerance=None, portfolio_id=None,
                        persist_result=False, load_if_available=False, progress_callback=None,
@@ -736,22 +1235,19 @@ def optimize_portfolio(start_date, end_date, risk_free_rate, ticker_group=None,
             # Remove whitespace and trailing backslashes (common in RTF)
             t_clean = t.strip().rstrip('\\')
             # Validate: Allow alphanumeric, dots, dashes, carets
-            if t_clean and re.match(r'^[A-Z0-9\.\-\^]+$', t_clean, re.IGNORECASE):
-                cleaned_tickers.append(t_clean)
+            if t_clean and _TICKER_RE.match(t_clean):
+                # Interned so the same ticker across requests is one shared object
+                cleaned_tickers.append(sys.intern(t_clean))
             else:
                 logger.warning(f"Ignoring invalid ticker format: '{t}'")
         tickers = cleaned_tickers
         if not tickers and not ticker_group:
              return {"error": "No valid tickers found after sanitization."}
 
-    # Log cache performance at start of optimization
-    cache = get_cache()
-    try:
-        cache_stats = cache.stats()
-        if 'l1_cache' in cache_stats:
-            logger.info(f"CACHE MEMORY: {cache_stats['l1_cache'].get('memory_usage_mb', 0):.1f}MB")
-    except Exception:
-        pass
+    # Log cache memory on a sample of optimizations (every CACHE_STATS_EVERY-th call)
+    if next(_optimize_calls) % CACHE_STATS_EVERY == 0:
+        l1_stats = get_cache().l1_cache.stats()
+        logger.info(f"CACHE MEMORY: {l1_stats.get('memory_usage_mb', 0):.1f}MB")
     
     # Short-circuit if saved result should be reused (Persistence Layer)
     if portfolio_id and load_if_available:
@@ -782,33 +1278,51 @@ def optimize_portfolio(start_date, end_date, risk_free_rate, ticker_group=None,
     final_tickers = pipeline_result["tickers"]
     latest_prices = pipeline_result.get("latest_prices", {})
 
+    # Convert to float64 arrays once; BL and the solvers work on these directly
+    asset_tickers = list(mu.index)
+    mu_arr = mu.to_numpy(dtype=np.float64)
+    S_arr = _cov_array(S, asset_tickers)
+
     # 3. Apply Optimization Logic (BL or MPT)
     if optimization_method in ["BL", "Black-Litterman"]:
         logger.info("Applying Black-Litterman Optimization")
         try:
-            # If uncertainties missing, set default
+            # View uncertainties as an array in mu's order. The pipeline already
+            # returns them aligned, so only reindex when it did not.
             if uncertainties is None:
-                uncertainties = pd.Series({t: 0.05 for t in mu.index})
+                u = np.full(len(mu_arr), 0.05)
+            elif uncertainties.index.equals(mu.index):
+                u = uncertainties.to_numpy(dtype=np.float64)
+            else:
+                u = uncertainties.reindex(mu.index).to_numpy(dtype=np.float64)
             
-            # Ensure uncertainties are positive to prevent divide-by-zero
-            uncertainties = uncertainties.clip(lower=1e-4)
+            # Missing uncertainties default to 0.05; keep them positive to prevent divide-by-zero
+            u = np.clip(np.where(np.isnan(u), 0.05, u), 1e-4, None)
             
             # Market Caps
-            mcaps = get_market_caps(list(mu.index))
+            mcaps = get_market_caps(asset_tickers)
             
             # Delta from Market
             delta = get_market_implied_risk_aversion_cached(start_date, end_date, risk_free_rate)
             
             if mcaps:
                 logger.info("Applying Black-Litterman with Market Prior")
-                market_prior = black_litterman.market_implied_prior_returns(mcaps, delta, S, risk_free_rate=risk_free_rate)
+                # Market-implied prior pi = delta * S w_mkt + rf, as in pypfopt's
+                # market_implied_prior_returns but on the aligned arrays.
+                # Tickers without a market cap get zero market weight.
+                w_mkt = np.fromiter((mcaps.get(t, 0.0) for t in asset_tickers),
+                                    dtype=np.float64, count=len(asset_tickers))
+                if len(mcaps) < len(asset_tickers):
+                    logger.warning(f"No market cap for {len(asset_tickers) - len(mcaps)} tickers; "
+                                   "giving them zero weight in the BL prior")
+                market_prior = delta * (S_arr @ (w_mkt / w_mkt.sum())) + risk_free_rate
                 
-                curr_uncertainties = uncertainties.reindex(mu.index).fillna(0.05)
-                omega = np.diag(curr_uncertainties ** 2)
-                
-                bl = BlackLittermanModel(S, pi=market_prior, absolute_views=mu, omega=omega, risk_aversion=delta)
-                mu = bl.bl_returns()
-                S = bl.bl_cov()
+                mu_arr, S_arr = _black_litterman_posterior(
+                    S_arr,
+                    market_prior,
+                    mu_arr,
+                    u * u,
+                )
                 logger.info("Black-Litterman optimization successful.")
             else:
                 logger.warning("No market caps available for BL. Fallback to Mean-Variance with Forecast.")
@@ -821,32 +1335,20 @@ def optimize_portfolio(start_date, end_date, risk_free_rate, ticker_group=None,
 
     # 4. Efficient Frontier Optimization
     try:
-        ef = EfficientFrontier(mu, S, weight_bounds=(0, max_asset_weight))
-
-        # Add L2 regularization
-        if l2_gamma > 0:
-            ef.add_objective(objective_functions.L2_reg, gamma=l2_gamma)
-
-        # Set optimization objective
-        if target_return:
-            ef.efficient_return(target_return)
-        elif risk_tolerance:
-            ef.efficient_risk(risk_tolerance)
+        if target_return or risk_tolerance:
+            # Target return/risk: reuse the cached, warm-started frontier problem
+            weights, performance = _solve_efficient_frontier(
+                asset_tickers, mu_arr, S_arr, risk_free_rate, max_asset_weight, l2_gamma,
+                target_return=target_return or None, target_volatility=risk_tolerance
+            )
         else:
-            ef.max_sharpe(risk_free_rate=risk_free_rate)
-
-        # Get optimized weights
-        weights = ef.clean_weights()
-        
-        # Filter out assets with near-zero weight
-        final_weights = {ticker: weight for ticker, weight in weights.items() if weight > 1e-4}
-
-        # Get performance metrics
-        performance = ef.portfolio_performance(risk_free_rate=risk_free_rate)
+            # Default objective: reuse the cached, warm-started max-Sharpe problem
+            weights, performance = _solve_max_sharpe(asset_tickers, mu_arr, S_arr, risk_free_rate, max_asset_weight, l2_gamma)
         # performance: (return, volatility, sharpe)
         
-        # Filter prices
-        final_prices = {t: latest_prices.get(t, 0.0) for t in final_weights.keys()}
+        # Near-zero weights are already dropped by the solver helpers
+        final_weights = weights
+        final_prices = {t: latest_prices.get(t, 0.0) for t in final_weights}
 
         result_payload = {
             "weights": final_weights,
@@ -868,7 +1370,9 @@ def optimize_portfolio(start_date, end_date, risk_free_rate, ticker_group=None,
                 "l2_gamma": l2_gamma,
                 "max_asset_weight": max_asset_weight
             }
-            save_portfolio_result(portfolio_id, result_payload, metadata)
+            # Persist in the background; the saved copy must not see the
+            # portfolio_id key added to the response below
+            save_portfolio_result_async(portfolio_id, dict(result_payload), metadata)
             result_payload["portfolio_id"] = portfolio_id
         
         return result_payload
@@ -927,7 +927,7 @@ class Installer:
             print("  Checking C++ compiler...")
             if not self.validator.check_cpp_compiler():
                 print("⚠️  Warning: C++ compiler not found")
-                print("   Some Python packages (like pmdarima) require a C++ compiler to install.")
+                print("   Packages without a prebuilt wheel for this Python version need one to build from source.")
                 
                 print("\n❓ Do you want to install Visual Studio Build Tools? (y/n): ", end='')
                 if input().strip().lower() in ['y', 'yes']: